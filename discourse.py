@@ -1,8 +1,34 @@
-import requests
+import httpx
+import asyncio
 import datetime
-import urllib
-from string import Formatter
+import time
+import re
 import collections
+import concurrent.futures
+import threading
+from functools import lru_cache
+
+try:
+	import orjson
+	_loads = orjson.loads
+except ImportError:
+	from json import loads as _loads
+
+try:
+	import ijson
+except ImportError:
+	ijson = None
+
+# httpx can only decode brotli bodies when a brotli implementation is
+# installed, so only advertise it to the server in that case
+try:
+	import brotli
+except ImportError:
+	try:
+		import brotlicffi as brotli
+	except ImportError:
+		brotli = None
+_ACCEPT_ENCODING = 'gzip, br' if brotli else 'gzip'
 
 """Discourse API in Python
 
@@ -46,53 +72,101 @@ TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 """str: The format string used to represent a timestamp in JSON data
 """
 
-def fixed_delete(url, params):
-	"""A wrapper around `requests.delete` that has a compatible signature
-	
-	For some reason, requests.delete doesn't allow a params argument, so
-	we need to encode it manually here
+def _compile(tpl):
+	"""Pre-compiles a URI template into a (fields, builder) pair
+
+	`fields` is a tuple of the placeholder names in the template;
+	`builder` maps an object dictionary to the formatted URI. Templates
+	with a single placeholder (the common case) are built by string
+	concatenation, which avoids re-parsing the format string per call.
 	"""
-	if params != None:
-		url += '?' + urllib.urlencode(
-			{k: v for k,v in params.iteritems() if v != None})
-	return requests.delete(url)
-
-"""API endpoint definition. Each endpoint is specified as a tuple:
-	0: The request function to use. Corresponds to GET, PUT, POST etc.
-	1: A format string describing the URI, formatted based on object members
-	2: If None, the json response is returned in its entirety;
-	   otherwise only the named member will be returned
+	keys = re.findall(r'{(\w+)}', tpl)
+	if not keys:
+		return (), lambda d, _t=tpl: _t
+	if len(keys) == 1:
+		k = keys[0]
+		prefix, suffix = tpl.split('{' + k + '}')
+		return (k,), \
+			lambda d, _p=prefix, _s=suffix, _k=k: _p + str(d[_k]) + _s
+	return tuple(keys), lambda d, _t=tpl: _t.format_map(d)
+
+Endpoint = collections.namedtuple('Endpoint',
+	['method', 'path', 'member', 'fields', 'build', 'call'])
+"""An API endpoint definition:
+	method: The HTTP method to use: 'GET', 'PUT', 'POST' or 'DELETE'
+	path:   A format string describing the URI, formatted based on
+	        object members
+	member: If None, the json response is returned in its entirety;
+	        otherwise only the named member will be returned
+	fields: The placeholder names the URI template needs
+	build:  A compiled URI builder taking the object dictionary
+	call:   A specialized request function taking (forum_object, params)
 """
 
-USER_GET1 =           (requests.get, "/users/{username}.json", 'user')
-USER_GET2 =           (requests.get, "/admin/users/{id}.json", None)
-USER_PUT =            (requests.put, "/users/{username}", 'user')
-
-GROUP_GET =           (requests.get, "/groups/{name}.json", 'basic_group')
-GROUP_PUT =           (requests.put, "/admin/groups/{id}", 'basic_group')
-GROUP_DELETE =        (fixed_delete, "/admin/groups/{id}", None)
-GROUP_ADD =           (requests.post, "/admin/groups", 'basic_group')
-GROUPS_GET =          (requests.get, "/admin/groups.json", None)
-
-GROUP_OWNERS_GET =    (requests.get, "/groups/{name}/members.json", 'owners')
-GROUP_OWNERS_ADD =    (requests.put, "/admin/groups/{id}/owners.json", None)
-GROUP_OWNERS_REMOVE = (fixed_delete, "/admin/groups/{id}/owners.json", None)
-GROUP_MEMBERS_GET =   (requests.get, "/groups/{name}/members.json", None)
-GROUP_MEMBERS_ADD =   (requests.put, "/admin/groups/{id}/members.json", None)
-GROUP_MEMBERS_REMOVE = (fixed_delete, "/admin/groups/{id}/members.json", None)
-GROUP_ADD_BULK =      (requests.put, "/admin/groups/bulk", None)
-
-CATEGORY_GET =        (requests.get, "/c/{id_or_slug}/show.json", 'category')
-CATEGORY_PUT =        (requests.put, "/categories/{id}", 'category')
-CATEGORY_DELETE =     (fixed_delete, "/categories/{id}", None)
-CATEGORY_SET_NOTIFY = (requests.post, "/category/{id}/notifications", None)
-CATEGORY_ADD =        (requests.post, "/categories", 'category')
+def _compile_call(method, path, member, fields, build):
+	"""Partially evaluates an endpoint into a closed request function
+
+	The returned closure has the method, member and URI handling baked
+	in, so invoking an endpoint costs one Python frame on top of the
+	API request instead of re-interpreting the definition tuple.
+	"""
+	if not fields:
+		def call(obj, params=None):
+			return obj.api.request(method, path, member, params)
+	else:
+		def call(obj, params=None):
+			if params:
+				for f in fields:
+					if f not in obj._d:
+						obj.update()
+						break
+			return obj.api.request(method, build(obj._d), member, params)
+	return call
+
+def _endpoint(method, tpl, member):
+	"""Builds an `Endpoint`, compiling its URI template once"""
+	fields, build = _compile(tpl)
+	call = _compile_call(method, tpl, member, fields, build)
+	return Endpoint(method, tpl, member, fields, build, call)
+
+USER_GET1 =           _endpoint('GET', "/users/{username}.json", 'user')
+USER_GET2 =           _endpoint('GET', "/admin/users/{id}.json", None)
+USER_PUT =            _endpoint('PUT', "/users/{username}", 'user')
+
+GROUP_GET =           _endpoint('GET', "/groups/{name}.json", 'basic_group')
+GROUP_PUT =           _endpoint('PUT', "/admin/groups/{id}", 'basic_group')
+GROUP_DELETE =        _endpoint('DELETE', "/admin/groups/{id}", None)
+GROUP_ADD =           _endpoint('POST', "/admin/groups", 'basic_group')
+GROUPS_GET =          _endpoint('GET', "/admin/groups.json", None)
+
+GROUP_OWNERS_GET =    _endpoint('GET', "/groups/{name}/members.json", 'owners')
+GROUP_OWNERS_ADD =    _endpoint('PUT', "/admin/groups/{id}/owners.json", None)
+GROUP_OWNERS_REMOVE = _endpoint('DELETE', "/admin/groups/{id}/owners.json", None)
+GROUP_MEMBERS_GET =   _endpoint('GET', "/groups/{name}/members.json", None)
+GROUP_MEMBERS_ADD =   _endpoint('PUT', "/admin/groups/{id}/members.json", None)
+GROUP_MEMBERS_REMOVE = _endpoint('DELETE', "/admin/groups/{id}/members.json", None)
+GROUP_ADD_BULK =      _endpoint('PUT', "/admin/groups/bulk", None)
+
+CATEGORY_GET =        _endpoint('GET', "/c/{id_or_slug}/show.json", 'category')
+CATEGORY_PUT =        _endpoint('PUT', "/categories/{id}", 'category')
+CATEGORY_DELETE =     _endpoint('DELETE', "/categories/{id}", None)
+CATEGORY_SET_NOTIFY = _endpoint('POST', "/category/{id}/notifications", None)
+CATEGORY_ADD =        _endpoint('POST', "/categories", 'category')
+
+@lru_cache(maxsize=8192)
+def _parse_time(string):
+	return datetime.datetime.strptime(string, TIME_FORMAT)
 
 def str_to_time(string):
-	""" Converts a standard date-time string into a datetime object """
+	""" Converts a standard date-time string into a datetime object
+
+	Parses are memoized by string: strptime costs tens of microseconds
+	and the same timestamps are re-read constantly, so repeated
+	conversions collapse to a dictionary lookup.
+	"""
 	if not string:
 		return None
-	return datetime.datetime.strptime(string, TIME_FORMAT)
+	return _parse_time(string)
 
 def time_to_str(time):
 	""" Converts a datetime object into a standard string format """
@@ -115,17 +189,16 @@ def reftype(x):
 
 def find(list, f, default=None):
 	"""Searches for an item in a collection based on a condition function
-	
+
 	Returns the first item in `list` for which `f(x)` evaluates to `True`
 	If no items match, `default` is returned
 	"""
-	for x in list:
-		if f(x):
-			return x
-	return default
+	return next((x for x in list if f(x)), default)
 
 def is_iterable(o):
-	return isinstance(o, collections.Iterable) and not isinstance(o, str)
+	# A plain duck-type check: the ABC __instancecheck__ is an order of
+	# magnitude slower, and collections.Iterable is gone in Python 3.10
+	return hasattr(o, '__iter__') and not isinstance(o, (str, bytes))
 	
 class Permission:
 	"""Constants for category permissions.
@@ -152,61 +225,107 @@ class AliasLevel:
 	GROUP_MEMBERS = 3
 	EVERYONE = 99
 
+_MISSING = object()
+
+class _FieldDesc(object):
+	"""Descriptor for a single JSON-backed field
+
+	One shared descriptor class replaces the pair of closures that
+	`AddProperties` used to build for every property: access goes
+	through a single C-level `__get__`/`__set__` dispatch, with the
+	field name and converters held in slots rather than closure cells.
+	"""
+
+	__slots__ = ('name', 'type', 'writable', 'set_cast', 'identity')
+
+	def __init__(self, name, type, writable, set_cast):
+		self.name = name
+		self.type = type
+		self.writable = writable
+		self.set_cast = set_cast
+		# reftype is a no-op converter; decide that once here rather
+		# than calling it on every read
+		self.identity = type is reftype
+
+	def __get__(self, obj, owner=None):
+		if obj is None:
+			return self
+		v = obj._d.get(self.name, _MISSING)
+		if v is _MISSING:
+			v = obj.get(self.name)
+		# JSON has already produced the declared type in the common
+		# case, so skip the redundant conversion call
+		if v is None or self.identity or type(v) is self.type:
+			return v
+		return self.type(v)
+
+	def __set__(self, obj, value):
+		if not self.writable:
+			raise AttributeError(
+				"Property '{0}' is read-only".format(self.name))
+		obj.set(self.name, self.set_cast(value))
+
 def AddProperties(c, list):
 	"""Adds named properties to a ForumObject class
-	
+
 	Args:
 		c: The class object to add properties to
 		list: A list of property tuples
-		
+
 	The function expects tuples of the form:
 		(name:str, type:function, writable:bool, set_cast:function)
-	
+
 	If they are not provided, the is assumed to be `str`, writable is assumed
 	True, and `set_cast` is set the same as `type`.
-	
+
 	A string on its own can be used in place of a singleton tuple. It will
 	create a read-write string property.
-	
+
 	Reading the property will return `type(self.get(name))`.
 	Writing it will call `self.set(name, set_cast(value))`.
-	
+
 	In `ForumObject`, these methods access the backing dictionary and
 	do any necessary HTTP requests.
-	
-	Additionally, the function will create a class method `get_writable` which
-	returns a tuple of writable property names. This is used by the object
-	classes for which all parameters must be set in every mutating HTTP request.
+
+	Additionally, the function will set a class attribute `_writable` with
+	a tuple of writable property names, exposed via `get_writable`. This is
+	used by the object classes for which all parameters must be set in every
+	mutating HTTP request.
 	"""
-	
+
+	defaults = (None, str, True, None)
 	wlist = []
 	for p in list:
-		# Load in arguments
+		# Load in arguments, padding out whatever was omitted
 		if isinstance(p, str):
 			p = (p,)
-		name = p[0]
-		type = str if len(p) <= 1 else p[1]
-		writable = True if len(p) <= 2 else p[2]
-		set_cast = type if len(p) <= 3 else p[3]
-		
-		# Create property object
+		name, type, writable, set_cast = p + defaults[len(p):]
+		if set_cast is None:
+			set_cast = type
+
 		if writable:
-			prop = property(lambda s,name=name,type=type: type(s.get(name)),
-			lambda s,v,name=name,set_cast=set_cast: s.set(name, set_cast(v)))
 			wlist.append(name)
-		else:
-			prop = property(lambda s,name=name,type=type: type(s.get(name)))
-		setattr(c, name, prop)
-	
+		setattr(c, name, _FieldDesc(name, type, writable, set_cast))
+
 	# Create `get_writable`
-	wlist = tuple(wlist)
-	setattr(c, 'get_writable', lambda s: wlist)
+	setattr(c, '_writable', tuple(wlist))
+	setattr(c, 'get_writable', lambda s, _w=c._writable: _w)
 
 class ForumObject(object):
 	"""Base class for a forum object backed by a JSON dictionary
-	
+
 	If needed, the backing dictionary can be accessed directly with `_d`
+
+	Instances use `__slots__`: bulk listings can create thousands of
+	these, and dropping the per-instance `__dict__` cuts their memory
+	footprint several-fold.
 	"""
+
+	__slots__ = ('api', '_d', 'suspended', 'has_changes', '_snapshot',
+		'_complete', '_dirty', '_timer', '_lock')
+
+	_writable = ()
+
 	def __init__(self, api):
 		if not api:
 			raise Exception("Cannot create a ForumObject with no API")
@@ -214,20 +333,27 @@ class ForumObject(object):
 		self._d = None
 		self.suspended = False
 		self.has_changes = False
-	
-	def request(self, url_tuple, params=None):
-		if params:
-			for i in Formatter().parse(url_tuple[1]):
-				if i[1] and i[1] not in self._d:
-					self.update()
-					break
-		url = url_tuple[1]
-		url = url.format(**self._d)
-		return self.api.request(url_tuple[0], url, url_tuple[2], params)
+		self._snapshot = None
+		self._complete = False
+		self._dirty = set()
+		self._timer = None
+		# Guards _dirty/_timer against the debounce timer thread
+		self._lock = threading.Lock()
+	
+	def request(self, endpoint, params=None):
+		# Objects handed an AsyncDiscourse must not fall onto the lazy
+		# sync paths: endpoint.call would store an un-awaited coroutine
+		# straight into _d and quietly corrupt the object. Fail loudly
+		# instead; hydrate up front via the async bulk methods.
+		if asyncio.iscoroutinefunction(self.api.request):
+			raise Exception("This object is bound to an async API; "
+				"lazy requests are not available. Fetch its state "
+				"up front (e.g. AsyncDiscourse.groups_full)")
+		return endpoint.call(self, params)
 	
 	def get_state(self):
 		"""Gets a map of writable properties and their values"""
-		return {k: self._d[k] for k in self.get_writable() if k in self._d}
+		return {k: self._d[k] for k in self._writable if k in self._d}
 	
 	def put_endpoint(self):
 		"""Gets the endpoint for updating
@@ -256,46 +382,123 @@ class ForumObject(object):
 	
 	def commit(self, changes=None):
 		"""Writes back your changes to the server
-		
+
 		Args:
 			changes: The map of changed field names to values. If None,
-			`self.get_state()` is used
+			the dirty fields are sent, or `self.get_state()` for
+			endpoints that require every field in each request
 		"""
-		if not changes:
-			changes = self.get_state()
-		self._d.update(self.request(self.put_endpoint(), changes))
-		self.has_changes = False
+		with self._lock:
+			if not changes:
+				if self.commit_all_fields() or not self._dirty:
+					changes = self.get_state()
+				else:
+					changes = {k: self._d[k] for k in self._dirty
+						if k in self._d}
+			sent = set(changes)
+		response = self.request(self.put_endpoint(), changes)
+		with self._lock:
+			# Only retire the keys this request actually carried;
+			# writes that landed while it was in flight stay dirty
+			self._dirty.difference_update(sent)
+			if response:
+				self._merge_response(response)
+			self.has_changes = bool(self._dirty)
+
+	def _merge_response(self, response):
+		"""Merges a mutation response into the backing dictionary"""
+		for k, v in response.items():
+			if k not in self._dirty:
+				self._d[k] = v
 	
 	def update(self):
 		"""Downloads the object state from the server"""
 		self._d = self.request(self.get_endpoint())
+		self._complete = True
 	
 	def suspend(self):
-		"""Pauses automatic committing when a value is changed"""
+		"""Pauses automatic committing when a value is changed
+
+		A snapshot of the current state is taken, so that `resume` can
+		commit only the fields that actually changed.
+		"""
 		self.suspended = True
-	
+		if self._d is not None:
+			self._snapshot = dict(self._d)
+
 	def resume(self):
-		"""Disables the suspension and commits changes"""
+		"""Disables the suspension and commits changes
+
+		All changes made while suspended are coalesced into a single
+		request, diffed against the snapshot taken by `suspend`.
+		"""
 		self.suspended = False
-		if self.has_changes:
+		snapshot = self._snapshot
+		self._snapshot = None
+		if not self.has_changes:
+			return
+		if self.commit_all_fields() or snapshot is None:
 			self.commit()
+			return
+		changes = {k: v for k, v in self._d.items()
+			if k in self._writable and
+				snapshot.get(k, _MISSING) != v}
+		if changes:
+			self.commit(changes)
+		else:
+			with self._lock:
+				self.has_changes = False
+				self._dirty.clear()
 	
 	def get(self, key):
-		"""Gets a value from the cache or server"""
-		if key not in self._d:
-			self.update()
+		"""Gets a value from the cache or server
+
+		Once the object has been fully downloaded, keys absent from the
+		response read as None instead of triggering another download.
+		"""
+		# Single .get with a sentinel, rather than an `in` check
+		# followed by a second lookup
+		v = self._d.get(key, _MISSING)
+		if v is not _MISSING:
+			return v
+		if self._complete:
+			return None
+		self.update()
 		return self._d[key]
 	
 	def set(self, key, value):
-		"""Sets a value, which will commit changes to the server if needed"""
-		self.has_changes = self.has_changes or \
-			(key not in self._d or self._d[key] != value)
-		self._d[key] = value
-		if not self.suspended and self.has_changes:
-			if not self.commit_all_fields():
-				self.commit({key: value})
-			else:
-				self.commit()
+		"""Sets a value, which will commit changes to the server if needed
+
+		When the API has `auto_batch_ms` set, the write is debounced on
+		a timer so rapid consecutive assignments coalesce into one
+		request even outside a `with` block.
+		"""
+		with self._lock:
+			if key not in self._d or self._d[key] != value:
+				self.has_changes = True
+				self._dirty.add(key)
+			self._d[key] = value
+			if self.suspended or not self.has_changes:
+				return
+			batch = getattr(self.api, 'auto_batch_ms', None)
+			if batch:
+				if self._timer != None:
+					self._timer.cancel()
+				self._timer = threading.Timer(batch / 1000.0,
+					self._flush)
+				self._timer.start()
+				return
+		self._flush()
+
+	def _flush(self):
+		"""Commits the pending dirty fields in a single request"""
+		with self._lock:
+			if self._timer != None:
+				self._timer.cancel()
+				self._timer = None
+			if not self.has_changes:
+				return
+		self.commit()
 	
 	def __enter__(self):
 		self.suspend()
@@ -304,21 +507,34 @@ class ForumObject(object):
 	def __exit__(self, type, value, traceback):
 		self.resume()
 	
+	def _identity(self):
+		"""A stable identity drawn from whatever is already loaded
+
+		Never touches the server: putting an object in a set or dict
+		must not cost an HTTP request.
+		"""
+		d = self._d
+		return d.get('id') or d.get('username') or d.get('name') \
+			or d.get('slug')
+
 	def __eq__(self, y):
+		if y is self:
+			return True
 		if not isinstance(y, type(self)):
 			return False
-		return self.id == y.id
-	
+		i = self._identity()
+		return i != None and i == y._identity()
+
 	def __ne__(self, y):
-		if not isinstance(y, type(self)):
-			return False
-		return self.id != y.id
-	
+		return not self.__eq__(y)
+
 	def __hash__(self):
-		return self.id
+		return hash(self._identity() or id(self))
 	
 class User(ForumObject):
 
+	__slots__ = ()
+
 	def __init__(self, api, params):
 		super(User, self).__init__(api)
 		if isinstance(params, int):
@@ -337,12 +553,17 @@ class User(ForumObject):
 		return USER_PUT
 	
 	def update(self, complete=True):
-		loaded = False
-		if 'username' in self._d and (complete or 'id' not in self._d):
-			super(User, self).update()
-			loaded = True
-		if complete or not loaded:
+		if 'id' in self._d:
+			# The admin endpoint alone returns the full record,
+			# username included, so the public lookup is redundant
 			self._d.update(self.request(USER_GET2))
+			self._complete = True
+			return
+		super(User, self).update()
+		if complete:
+			self._d.update(self.request(USER_GET2))
+		# A lone USER_GET1 response lacks the admin-only fields
+		self._complete = complete
 	
 	def __str__(self):
 		return self.username
@@ -370,6 +591,9 @@ AddProperties(User, [
 ])
 
 class UserList(object):
+
+	__slots__ = ('_group', '_list')
+
 	def __init__(self, group):
 		self._group = group
 		self._list = None
@@ -383,6 +607,10 @@ class UserList(object):
 	def del_endpoint(self):
 		raise Exception("Endpoint not defined")
 	
+	def _invalidate(self):
+		"""Drops any cached member data after a mutation"""
+		self._list = None
+
 	def add(self, members):
 		if not is_iterable(members):
 			members = [members]
@@ -397,19 +625,25 @@ class UserList(object):
 					members[i] = self._group.api.user(m).username
 		self._group.request(self.add_endpoint(), \
 			{'usernames': ",".join(members)})
-		self._list = None
-	
+		self._invalidate()
+
 	def remove(self, members):
 		if not is_iterable(members):
 			members = [members]
+		# Resolve everything to ids first, then remove in one request
+		# rather than one round-trip per user
+		ids = []
 		for i in members:
 			if not isinstance(i, int):
 				if isinstance(i, User):
 					i = i.id
 				else:
 					i = self._group.api.user(i).id
-			self._group.request(self.del_endpoint(), {'user_id': i})
-		self._list = None
+			ids.append(i)
+		if ids:
+			self._group.request(self.del_endpoint(),
+				{'user_ids': ",".join(str(i) for i in ids)})
+		self._invalidate()
 
 	def update(self):
 		self._list = self._group.request(self.get_endpoint())
@@ -425,31 +659,57 @@ class UserList(object):
 		return User(self._group.api, self._list[i])
 			
 	def replace_all(self, members):
+		"""Makes the list contain exactly `members`
+
+		The diff is computed over usernames, so only the genuine
+		additions and removals are sent: one bulk add and one bulk
+		remove at most, with removal ids taken from the records
+		already downloaded.
+		"""
 		if not self._list:
 			self.update()
 		members = list(members) if is_iterable(members) else [members]
-		toAdd = set()
-		for i in range(len(members)):
-			m = members[i]
-			if not isinstance(m, User):
-				toAdd.add(self._group.api.user(m))
+		api = self._group.api
+		targets = set()
+		for m in members:
+			if isinstance(m, User):
+				targets.add(m.username)
+			elif isinstance(m, str):
+				targets.add(m)
 			else:
-				toAdd.add(m)
-		toRemove = {o for o in self._list}
-		cmdRemove = toRemove.difference(toAdd)
-		cmdAdd = ",".join(toAdd.difference(toRemove))
-		self._group.request(self.add_endpoint(), {'usernames': cmdAdd})
-		for id in cmdRemove:
-			self._group.request(self.del_endpoint(), {'user_id': id})
-		self._list = members
+				targets.add(api.user(m).username)
+		current = {m['username']: m for m in self._list}
+		toAdd = targets.difference(current)
+		toRemove = [m for name, m in current.items()
+			if name not in targets]
+		if toAdd:
+			self._group.request(self.add_endpoint(),
+				{'usernames': ",".join(toAdd)})
+		if toRemove:
+			self._group.request(self.del_endpoint(),
+				{'user_ids': ",".join(str(m['id']) for m in toRemove)})
+		self._invalidate()
 	
 class MemberList(UserList):
+	"""A `UserList` over the paginated group members endpoint
+
+	Fetched pages are cached by page index, so sequential or repeated
+	access costs one request per `PAGE_SIZE` members rather than one
+	per miss. Iteration prefetches upcoming pages on a small thread
+	pool to hide request latency behind the caller's processing.
+	"""
+
+	PAGE_SIZE = 50
+	PREFETCH = 2
+
+	__slots__ = ('__pages', '__count', '__executor')
 
 	def __init__(self, group):
 		super(MemberList, self).__init__(group)
-		self.__offset = 0
+		self.__pages = {}
 		self.__count = None
-	
+		self.__executor = None
+
 	def get_endpoint(self):
 		return GROUP_MEMBERS_GET
 
@@ -458,37 +718,134 @@ class MemberList(UserList):
 
 	def del_endpoint(self):
 		return GROUP_MEMBERS_REMOVE
-	
+
+	def _invalidate(self):
+		super(MemberList, self)._invalidate()
+		self.__pages = {}
+		self.__count = None
+
+	def update(self):
+		# The members endpoint wraps its records, unlike the owners one
+		data = self._group.request(self.get_endpoint(),
+			{'offset': 0, 'limit': self.__len__()})
+		self._list = data['members']
+
+	def _fetch_page(self, page):
+		return self._group.request(self.get_endpoint(),
+			{'offset': page * self.PAGE_SIZE, 'limit': self.PAGE_SIZE})
+
+	def _store_page(self, page, data):
+		self.__count = int(data['meta']['total'])
+		users = [User(self._group.api, p) for p in data['members']]
+		self.__pages[page] = users
+		return users
+
+	def _load_page(self, page):
+		users = self.__pages.get(page)
+		if users is None:
+			users = self._store_page(page, self._fetch_page(page))
+		return users
+
 	def __len__(self):
 		if self.__count == None:
-			data = self._group.request(self.get_endpoint(), {'limit': 0})
-			self.__count = int(data['meta']['total'])
+			# Every page response carries meta.total, so fetch page 0
+			# and keep the data instead of a throwaway count request
+			self._load_page(0)
 		return self.__count
-	
+
 	def __getitem__(self, i):
-		list = self._list
-		offset = self.__offset
-		if not list or i < offset or i >= len(list)+offset:
-			group = self._group
-			data = group.request(self.get_endpoint(), {'offset': i})
-			self.__offset = i
-			self.__count = int(data['meta']['total'])
-			self._list = [User(group.api, p) for p in data['members']]
-		return self._list[i - self.__offset]
-	
+		page, offset = divmod(i, self.PAGE_SIZE)
+		return self._load_page(page)[offset]
+
+	def __iter__(self):
+		if self.__executor == None:
+			self.__executor = \
+				concurrent.futures.ThreadPoolExecutor(max_workers=4)
+		count = len(self)
+		last = (count - 1) // self.PAGE_SIZE
+		pending = {}
+		for i in range(count):
+			page, offset = divmod(i, self.PAGE_SIZE)
+			if offset == 0:
+				# Warm the next pages while this one is consumed
+				for p in range(page + 1,
+					min(page + 1 + self.PREFETCH, last + 1)):
+					if p not in self.__pages and p not in pending:
+						pending[p] = \
+							self.__executor.submit(self._fetch_page, p)
+			f = pending.pop(page, None)
+			if f != None and page not in self.__pages:
+				self._store_page(page, f.result())
+			yield self[i]
+
+	async def aiter(self):
+		"""Asynchronously iterates members, prefetching the next page
+
+		The owning group must belong to an `AsyncDiscourse`. While one
+		page's members are being consumed the following page is already
+		in flight, so a full walk is bounded by the slower of network
+		and processing rather than their sum.
+		"""
+		group = self._group
+		api = group.api
+		ep = self.get_endpoint()
+		url = ep.build(group._d)
+
+		def fetch(page):
+			return api.request(ep.method, url, ep.member,
+				{'offset': page * self.PAGE_SIZE,
+					'limit': self.PAGE_SIZE})
+
+		data = await fetch(0)
+		last = (int(data['meta']['total']) - 1) // self.PAGE_SIZE
+		page = 0
+		while True:
+			pending = None
+			if page < last:
+				pending = asyncio.ensure_future(fetch(page + 1))
+			for p in data['members']:
+				yield User(api, p)
+			if pending == None:
+				break
+			data = await pending
+			page += 1
+
 	def add_bulk(self, emails):
 		self._group.request(GROUP_ADD_BULK, {
 			'group_id': self._group.id, 'users[]': emails})
-		self._list = None
-	
+		self._invalidate()
+
 	def to_list(self, f=None):
-		data = self._group.request(self.get_endpoint(), 
+		data = self._group.request(self.get_endpoint(),
 			{'offset': 0, 'limit': self.__len__()})
 		if f != None:
 			return [f(p) for p in data['members']]
 		return [User(self._group.api, p) for p in data['members']]
 
+	def stream(self, f=None):
+		"""Iterates members from one streamed, incrementally-parsed GET
+
+		Like `to_list` this fetches everything in a single request, but
+		user records are yielded as they are decoded rather than
+		materializing the whole response, keeping memory flat for very
+		large groups.
+		"""
+		group = self._group
+		ep = self.get_endpoint()
+		for field in ep.fields:
+			if field not in group._d:
+				group.update()
+				break
+		url = ep.build(group._d)
+		params = {'offset': 0, 'limit': self.__len__()}
+		for p in group.api.request_stream(ep.method, url, 'members',
+			params):
+			yield f(p) if f != None else User(group.api, p)
+
 class OwnerList(UserList):
+
+	__slots__ = ()
+
 	def get_endpoint(self):
 		return GROUP_OWNERS_GET
 
@@ -501,6 +858,8 @@ class OwnerList(UserList):
 
 class Group(ForumObject):
 
+	__slots__ = ('__members', '__owners')
+
 	def __init__(self, api, params):
 		super(Group, self).__init__(api)
 		if isinstance(params, str):
@@ -508,14 +867,30 @@ class Group(ForumObject):
 			self.update()
 		else:
 			self._d = params
-		self.__members = MemberList(self)
-		self.__owners = OwnerList(self)
-	
-	members = property(lambda s: s.__members, 
-		lambda s,v: s.__members.replace_all(v))
-	
-	owners = property(lambda s: s.__owners, 
-		lambda s,v: s.__owners.replace_all(v))
+		# Built on first access: bulk listings create many groups
+		# whose member lists are never touched
+		self.__members = None
+		self.__owners = None
+
+	@property
+	def members(self):
+		if self.__members == None:
+			self.__members = MemberList(self)
+		return self.__members
+
+	@members.setter
+	def members(self, v):
+		self.members.replace_all(v)
+
+	@property
+	def owners(self):
+		if self.__owners == None:
+			self.__owners = OwnerList(self)
+		return self.__owners
+
+	@owners.setter
+	def owners(self, v):
+		self.owners.replace_all(v)
 	
 	def get_endpoint(self):
 		return GROUP_GET
@@ -553,9 +928,12 @@ AddProperties(Group, [
 ])
 	
 class Category(ForumObject):
-	
+
+	__slots__ = ('_perm_index',)
+
 	def __init__(self, api, params={}):
 		super(Category, self).__init__(api)
+		self._perm_index = None
 		if isinstance(params, int):
 			self._d = {'id': params}
 			self.update()
@@ -575,35 +953,58 @@ class Category(ForumObject):
 		return True
 	
 	def update(self):
-		self._d['id_or_slug'] = self._d.get('id') or self._d['slug']
+		if 'id_or_slug' not in self._d:
+			self._d['id_or_slug'] = self._d.get('id') or self._d['slug']
 		super(Category, self).update()
+		self._perm_index = None
+
+	def _merge_response(self, response):
+		super(Category, self)._merge_response(response)
+		# The response carries a fresh group_permissions list; the
+		# index would otherwise keep pointing at the orphaned entries
+		self._perm_index = None
 	
 	def get_state(self):
 		state = super(Category, self).get_state()
 		gp = self._d.get('group_permissions')
 		if gp:
 			for x in gp:
-				state["permissions[{0}]".format(x['group_name'])] = \
+				state[f"permissions[{x['group_name']}]"] = \
 					x['permission_type']
 		return state
 	
+	def _perms(self):
+		"""A group_name -> entry index over group_permissions
+
+		Built lazily from the loaded list and invalidated on update,
+		so permission lookups are O(1) dictionary hits.
+		"""
+		if self._perm_index == None:
+			gp = self.get('group_permissions') or []
+			self._perm_index = {x['group_name']: x for x in gp}
+		return self._perm_index
+
 	def get_permission(self, key):
-		p = find(self.get('group_permissions'),
-			lambda x: x['group_name'] == key)
+		p = self._perms().get(key)
 		if p:
 			return p['permission_type']
 		return Permission.NONE
-	
+
 	def set_permission(self, key, value):
-		p = find(self.get('group_permissions'),
-			lambda x: x['group_name'] == key)
+		p = self._perms().get(key)
 		if p:
 			p['permission_type'] = int(value)
 		else:
-			self.get('group_permissions').append({
-				'group_name': key,
-				'permission_type': value})
-		if not self.suspended:
+			p = {'group_name': key, 'permission_type': value}
+			gp = self.get('group_permissions')
+			if gp == None:
+				gp = self._d['group_permissions'] = []
+			gp.append(p)
+			self._perm_index[key] = p
+		if self.suspended:
+			# Flushed with everything else on resume, via get_state()
+			self.has_changes = True
+		else:
 			self.commit()
 	
 	@property
@@ -649,6 +1050,87 @@ AddProperties(Category, [
 	('custom_fields', reftype, False)
 ])
 
+def _copy_body(j):
+	"""Deeply copies a cached response body
+
+	Cached bodies end up installed as an object's backing dictionary,
+	so handing out the stored object itself would alias live, mutable
+	state between the cache and every object served from it. The copy
+	must recurse: in-place edits reach nested structures too (e.g.
+	set_permission mutating group_permissions entries), and a shared
+	inner list would leak them into the cache all the same.
+	"""
+	if isinstance(j, dict):
+		return {k: _copy_body(v) for k, v in j.items()}
+	if isinstance(j, list):
+		return [_copy_body(v) for v in j]
+	return j
+
+def _auth_params(apiName, apiKey):
+	"""Default query parameters carrying the API credentials"""
+	params = {}
+	if apiName:
+		params['api_username'] = apiName
+	if apiKey:
+		params['api_key'] = apiKey
+	return params
+
+class _ResponseReader(object):
+	"""A minimal file-like adapter over a streamed httpx response
+
+	Exposes the `read` method incremental JSON parsers expect, pulling
+	bytes from the response on demand rather than buffering the whole
+	body first.
+	"""
+
+	def __init__(self, response):
+		self._chunks = response.iter_bytes()
+		self._buf = b''
+
+	def read(self, size=-1):
+		if size < 0:
+			out = self._buf + b''.join(self._chunks)
+			self._buf = b''
+			return out
+		while len(self._buf) < size:
+			try:
+				self._buf += next(self._chunks)
+			except StopIteration:
+				break
+		out = self._buf[:size]
+		self._buf = self._buf[size:]
+		return out
+
+class _TTLCache(object):
+	"""A minimal size-bounded TTL cache for GET responses
+
+	Entries expire after `ttl` seconds; when full, the oldest entry is
+	evicted. Used by `Discourse.request` so that repeated reads of the
+	same resource within the window don't hit the server again.
+	"""
+
+	def __init__(self, maxsize=4096, ttl=30):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self._d = {}
+
+	def get(self, key):
+		entry = self._d.get(key)
+		if not entry:
+			return None
+		if entry[0] < time.monotonic():
+			del self._d[key]
+			return None
+		return entry[1]
+
+	def set(self, key, value):
+		if len(self._d) >= self.maxsize:
+			del self._d[next(iter(self._d))]
+		self._d[key] = (time.monotonic() + self.ttl, value)
+
+	def clear(self):
+		self._d.clear()
+
 class ObjectCreator(object):
 	def __init__(self, obj, finish):
 		self.obj = obj
@@ -663,39 +1145,149 @@ class ObjectCreator(object):
 
 class Discourse(object):
 	
-	def __init__(self, url, apiName=None, apiKey=None):
+	def __init__(self, url, apiName=None, apiKey=None, auto_batch_ms=None):
 		self.url = url
 		self.apiName = apiName
 		self.apiKey = apiKey
-	
-	def request(self, function, url, member, params=None, throwOnFail=True):
-		if not params:
-			params = {}
-		if self.apiName:
-			params['api_username'] = self.apiName
-		if self.apiKey:
-			params['api_key'] = self.apiKey
-		r = function(self.url + url, params)
+		self.auto_batch_ms = auto_batch_ms
+		# A single keep-alive client; with HTTP/2 enabled, concurrent
+		# requests multiplex over one pooled connection to the forum
+		# host. The credentials ride along as default params so they
+		# aren't re-merged into every request.
+		self._client = httpx.Client(base_url=url, http2=True,
+			limits=httpx.Limits(max_keepalive_connections=10,
+				max_connections=20),
+			timeout=httpx.Timeout(30.0, connect=3.05),
+			transport=httpx.HTTPTransport(retries=3),
+			headers={'Accept-Encoding': _ACCEPT_ENCODING},
+			params=_auth_params(apiName, apiKey))
+		self._get_cache = _TTLCache()
+		self._user_cache = {}
+		# url/params -> (etag, parsed body), in LRU order
+		self._etag_cache = collections.OrderedDict()
+
+	def request(self, method, url, member, params=None, throwOnFail=True):
+		# Bind the hot attributes to locals once, rather than paying a
+		# dict lookup for each use below
+		client = self._client
+		cache = self._get_cache
+		params = {} if params is None else params
+		key = None
+		if method == 'GET':
+			try:
+				key = (url, member, tuple(sorted(params.items())))
+				# Tuples hash lazily, so sorting alone doesn't prove
+				# the values are hashable; probe now so list-valued
+				# params fall through to an uncached request instead
+				# of blowing up inside the cache lookup
+				hash(key)
+			except TypeError:
+				key = None
+			if key is not None:
+				cached = cache.get(key)
+				if cached is not None:
+					return _copy_body(cached)
+		# Revalidate against any stored ETag: a 304 costs no body
+		# bytes and no JSON decode
+		headers = None
+		stale = None
+		if key is not None:
+			stale = self._etag_cache.get(key)
+			if stale is not None:
+				headers = {'If-None-Match': stale[0]}
+		if method in ('GET', 'DELETE'):
+			r = client.request(method, url, params=params,
+				headers=headers)
+		else:
+			r = client.request(method, url, data=params)
+		if stale is not None and r.status_code == 304:
+			self._etag_cache.move_to_end(key)
+			cache.set(key, _copy_body(stale[1]))
+			return _copy_body(stale[1])
 		if r.status_code != 200 and not throwOnFail:
 			return None
 		r.raise_for_status()
-		j = r.json()
+		j = _loads(r.content)
 		if isinstance(j, dict):
 			errors = j.get('errors')
 			if errors:
 				raise Exception(errors)
 		if member:
 			j = j[member]
+		if key is not None:
+			cache.set(key, _copy_body(j))
+			etag = r.headers.get('etag')
+			if etag:
+				ec = self._etag_cache
+				ec[key] = (etag, _copy_body(j))
+				ec.move_to_end(key)
+				if len(ec) > 1024:
+					ec.popitem(last=False)
+		elif method != 'GET':
+			# Mutations may touch any number of derived views of the
+			# resource, so drop everything rather than track tags
+			cache.clear()
 		return j
 	
+	def request_stream(self, method, url, item_path, params=None):
+		"""Yields items from a large JSON array response incrementally
+
+		`item_path` names the top-level member holding the array. With
+		`ijson` installed the body is parsed as it arrives off the
+		socket, so the full response is never held in memory; otherwise
+		this degrades to a buffered parse of the same data.
+		"""
+		with self._client.stream(method, url, params=params) as r:
+			r.raise_for_status()
+			if ijson != None:
+				for item in ijson.items(_ResponseReader(r),
+					item_path + '.item'):
+					yield item
+			else:
+				for item in _loads(r.read())[item_path]:
+					yield item
+
 	def groups(self):
-		return [Group(self, p) for p in self.request(GROUPS_GET)]
-	
+		return [Group(self, p) for p in self.request(*GROUPS_GET[:3])]
+
+	def groups_full(self):
+		"""Fetches and fully hydrates every group in parallel
+
+		A synchronous wrapper around `AsyncDiscourse.groups_full`: the
+		per-group detail requests overlap instead of running serially,
+		and the returned groups are bound to this API instance.
+		"""
+		async def run():
+			api = AsyncDiscourse(self.url, self.apiName, self.apiKey)
+			try:
+				return await api.groups_full()
+			finally:
+				await api.aclose()
+		return [Group(self, g._d) for g in asyncio.run(run())]
+
 	def group(self, name):
 		return Group(self, name)
 
 	def user(self, name):
-		return User(self, name)
+		"""Looks up a user by username or id
+
+		Resolved users are memoized under both keys: constructing a
+		User fires a lookup request, and member operations resolve the
+		same names over and over, so repeat calls are free.
+		"""
+		cache = self._user_cache
+		u = cache.get(name)
+		if u == None:
+			u = User(self, name)
+			if len(cache) > 4096:
+				cache.clear()
+			cache[name] = u
+			d = u._d
+			if 'username' in d:
+				cache[d['username']] = u
+			if 'id' in d:
+				cache[d['id']] = u
+		return u
 	
 	def category(self, id):
 		return Category(self, id)
@@ -728,3 +1320,121 @@ class Discourse(object):
 			cat._d = cat.request(CATEGORY_ADD, c.get_state())
 			cat.suspended = False
 		return ObjectCreator(cat, cat_create)
+
+class ServiceOverloadError(Exception):
+	"""Raised when the server signals overload (HTTP 429 or 503)"""
+
+class _AdaptiveLimiter(object):
+	"""An AIMD concurrency limiter for the async request path
+
+	Successful requests grow the in-flight limit additively; an
+	overload response halves it, TCP-congestion style. This keeps bulk
+	syncs near the server's sweet spot without a hand-tuned constant.
+	"""
+
+	def __init__(self, initial=4, minimum=1, maximum=64):
+		self.minimum = minimum
+		self.maximum = maximum
+		self._limit = initial
+		self._active = 0
+		self._cond = asyncio.Condition()
+
+	async def __aenter__(self):
+		async with self._cond:
+			while self._active >= self._limit:
+				await self._cond.wait()
+			self._active += 1
+		return self
+
+	async def __aexit__(self, type, value, traceback):
+		async with self._cond:
+			self._active -= 1
+			if type is None:
+				if self._limit < self.maximum:
+					self._limit += 1
+			elif issubclass(type, ServiceOverloadError):
+				self._limit = max(self.minimum, self._limit // 2)
+			self._cond.notify_all()
+
+class AsyncDiscourse(object):
+	"""An asyncio variant of `Discourse` for bulk operations
+
+	Independent requests awaited together (e.g. with `asyncio.gather`)
+	overlap over a single multiplexed HTTP/2 connection, so N lookups
+	cost roughly one round-trip rather than N. Concurrency is capped
+	with a semaphore to avoid overloading the server.
+
+	Objects returned by the bulk methods are ordinary `ForumObject`s
+	constructed from already-fetched data; hydrate them up-front rather
+	than relying on lazy per-property fetches, which are synchronous.
+
+	Concurrency adapts to the server: 429/503 responses shrink the
+	in-flight window and are retried with backoff, successes grow it.
+	"""
+
+	MAX_RETRIES = 5
+
+	def __init__(self, url, apiName=None, apiKey=None):
+		self.url = url
+		self.apiName = apiName
+		self.apiKey = apiKey
+		self._client = httpx.AsyncClient(base_url=url, http2=True,
+			timeout=httpx.Timeout(30.0, connect=3.05),
+			transport=httpx.AsyncHTTPTransport(retries=3),
+			headers={'Accept-Encoding': _ACCEPT_ENCODING},
+			params=_auth_params(apiName, apiKey))
+		self._limiter = _AdaptiveLimiter()
+
+	async def request(self, method, url, member, params=None,
+		throwOnFail=True):
+		delay = 0.2
+		for attempt in range(self.MAX_RETRIES):
+			try:
+				return await self._do_request(method, url, member, params,
+					throwOnFail)
+			except ServiceOverloadError:
+				if attempt == self.MAX_RETRIES - 1:
+					raise
+				await asyncio.sleep(delay)
+				delay *= 2
+
+	async def _do_request(self, method, url, member, params, throwOnFail):
+		async with self._limiter:
+			if method in ('GET', 'DELETE'):
+				r = await self._client.request(method, url, params=params)
+			else:
+				r = await self._client.request(method, url, data=params)
+			if r.status_code in (429, 503):
+				raise ServiceOverloadError(r.status_code)
+		if r.status_code != 200 and not throwOnFail:
+			return None
+		r.raise_for_status()
+		j = _loads(r.content)
+		if isinstance(j, dict):
+			errors = j.get('errors')
+			if errors:
+				raise Exception(errors)
+		if member:
+			j = j[member]
+		return j
+
+	async def groups(self):
+		data = await self.request(*GROUPS_GET[:3])
+		return [Group(self, p) for p in data]
+
+	async def groups_full(self):
+		"""Fetches the group list and hydrates every group concurrently
+
+		The per-group detail requests are fired together under the
+		adaptive limiter, so hydrating N groups costs on the order of
+		one round-trip rather than N.
+		"""
+		basic = await self.request(*GROUPS_GET[:3])
+		full = await asyncio.gather(*[
+			self.request(GROUP_GET.method, GROUP_GET.build(g),
+				GROUP_GET.member)
+			for g in basic])
+		return [Group(self, p) for p in full]
+
+	async def aclose(self):
+		await self._client.aclose()